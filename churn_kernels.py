@@ -0,0 +1,20 @@
+from numba import njit, prange
+
+# -----------------------------
+# NUMBA KERNELS
+# -----------------------------
+# Kept out of streamlit_app.py: loading a cached kernel re-imports its module,
+# which for the app script would re-run the whole page mid-run. This module
+# is also imported once per process, so the compiled kernel survives reruns.
+
+@njit(parallel=True, cache=True)
+def engineer(tenure, monthly, total, senior, fiber, out_ratio, out_tg, out_sf, out_hr):
+    # Reads the inputs once and writes all four engineered features per row.
+    # NaN tenure/charges compare False, matching the pandas expressions.
+    for i in prange(tenure.shape[0]):
+        m = monthly[i]
+        tn = tenure[i]
+        out_ratio[i] = m / (total[i] + 1.0)
+        out_tg[i] = 1 if 12.0 <= tn <= 36.0 else 0
+        out_sf[i] = senior[i] * fiber[i]
+        out_hr[i] = 1 if m > 80.0 else 0
@@ -0,0 +1,56 @@
+import joblib
+import numpy as np
+from onnx import TensorProto, helper, numpy_helper
+from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+from skl2onnx import convert_sklearn, update_registered_converter
+from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+from xgboost import XGBClassifier
+
+# -----------------------------
+# OFFLINE: churn_model.pkl -> churn.onnx
+# -----------------------------
+# Run once after retraining; the app picks up churn.onnx automatically and
+# serves it with ONNX Runtime. Offline-only dependencies, on top of
+# requirements.txt (joblib, numpy, xgboost):
+#   pip install onnx skl2onnx onnxmltools
+
+# skl2onnx needs the XGBoost converter from onnxmltools
+update_registered_converter(
+    XGBClassifier, "XGBoostXGBClassifier",
+    calculate_linear_classifier_output_shapes, convert_xgboost,
+    options={"nocl": [True, False], "zipmap": [True, False, "columns"]},
+)
+
+model = joblib.load("churn_model.pkl")
+scaler, clf = model.steps[0][1], model.steps[-1][1]
+
+# Trees only; plain probability matrix as output 1 (no ZipMap)
+onx = convert_sklearn(
+    clf,
+    initial_types=[("scaled", FloatTensorType([None, 19]))],  # len(FEATURES) in streamlit_app.py
+    options={XGBClassifier: {"zipmap": False}},
+    target_opset={"": 12, "ai.onnx.ml": 2},
+)
+
+# Prepend the scaler by hand: X (float64) -> (X - mean) / scale in float64 -> float32.
+# That is exactly what the sklearn Pipeline does; skl2onnx's scaler works in
+# float32 and flips the XGBoost splits that sit on the scaled 0/1 flags.
+graph = onx.graph
+graph.input[0].CopyFrom(helper.make_tensor_value_info("X", TensorProto.DOUBLE, [None, 19]))
+graph.initializer.extend([
+    numpy_helper.from_array(scaler.mean_.astype(np.float64), "scaler_mean"),
+    numpy_helper.from_array(scaler.scale_.astype(np.float64), "scaler_scale"),
+])
+tree_nodes = list(graph.node)
+del graph.node[:]
+graph.node.extend([
+    helper.make_node("Sub", ["X", "scaler_mean"], ["X_centered"]),
+    helper.make_node("Div", ["X_centered", "scaler_scale"], ["X_scaled"]),
+    helper.make_node("Cast", ["X_scaled"], ["scaled"], to=TensorProto.FLOAT),
+    *tree_nodes,
+])
+
+with open("churn.onnx", "wb") as f:
+    f.write(onx.SerializeToString())
+print("✅ Wrote churn.onnx")
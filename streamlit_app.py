@@ -1,7 +1,17 @@
+import csv
+import io
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from sklearn.pipeline import Pipeline
+
+from churn_kernels import engineer
 
 # -----------------------------
 # APP + MODEL
@@ -10,10 +20,32 @@ st.set_page_config(page_title="Churn Predictor", layout="centered")
 st.title("📊 Customer Churn Prediction")
 st.markdown("Upload customer data below or manually enter values to predict churn.")
 
+class OnnxModel:
+    # predict_proba-compatible wrapper around an ONNX Runtime session
+    def __init__(self, path: str):
+        # Imported here: only needed when churn.onnx has been generated
+        import onnxruntime as ort
+        self.sess = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.sess.get_inputs()[0].name
+
+    def predict_proba(self, X) -> np.ndarray:
+        # outputs are [label, probabilities] (exported without ZipMap)
+        return self.sess.run(None, {self.input_name: np.asarray(X, dtype=np.float64)})[1]
+
 @st.cache_resource
 def load_model():
+    # Prefer the ONNX export when it has been generated (python convert_to_onnx.py)
+    if os.path.exists("churn.onnx"):
+        return OnnxModel("churn.onnx")
+
     # Make sure churn_model.pkl is in the same folder as this file
-    return joblib.load("churn_model.pkl")
+    m = joblib.load("churn_model.pkl")
+
+    # Predict on every core for bulk CSVs (the classifier sits at the end of the Pipeline)
+    estimator = m.steps[-1][1] if isinstance(m, Pipeline) else m
+    if hasattr(estimator, 'n_jobs'):
+        estimator.set_params(n_jobs=-1)
+    return m
 
 model = load_model()
 
@@ -26,96 +58,218 @@ FEATURES = [
     'PaymentMethod_Mailed check', 'TenureGroup_Mid', 'ChargeRatio',
     'Senior_Fiber', 'HighRisk'
 ]
+_COL = {f: i for i, f in enumerate(FEATURES)}
+# The Pipeline's StandardScaler was fitted on float64 and XGBoost splits on the
+# scaled 0/1 flags sit exactly on those values; scaling float32 input rounds
+# differently and flips them, so features are built and passed as float64
+FEATURE_DTYPE = np.float64
+# Raw-CSV features that can come out NaN (unknown category codes are tracked
+# separately; the one-hot comparisons can't be missing)
+_NAN_COLS = [_COL[f] for f in ['SeniorCitizen', 'tenure', 'MonthlyCharges', 'TotalCharges', 'ChargeRatio', 'Senior_Fiber']]
+
+# Raw Yes/No columns encoded through a single categorical pass
+BINARY_YES_NO = ['Partner', 'Dependents', 'PhoneService', 'PaperlessBilling', 'MultipleLines']
+YES_NO = ['No', 'Yes']
+MALE_FEMALE = ['Male', 'Female']  # <- match training (Male=0, Female=1)
+
+# Explicit Arrow column types for raw uploads: skips type inference and keeps
+# string factors dictionary-encoded (read back as pandas categoricals). The
+# numeric inputs are read as text and coerced in build_feature_matrix, so
+# values like ' ', '12.0' or '$29.85' become NaN instead of failing the upload.
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+RAW_NUMERIC = ['SeniorCitizen', 'tenure', 'MonthlyCharges', 'TotalCharges']
+RAW_DTYPES = {
+    'gender': _CATEGORY, 'Partner': _CATEGORY, 'Dependents': _CATEGORY,
+    'PhoneService': _CATEGORY, 'PaperlessBilling': _CATEGORY, 'MultipleLines': _CATEGORY,
+    'InternetService': _CATEGORY, 'PaymentMethod': _CATEGORY,
+    **{c: pa.string() for c in RAW_NUMERIC},
+}
+
+# Bulk CSVs are parsed by Arrow's multi-threaded reader and scored one
+# record batch (about this many bytes of CSV) at a time
+CSV_BLOCK_SIZE = 8 << 20
+PREVIEW_ROWS = 1_000
 
 # -----------------------------
 # RAW -> PROCESSED
 # -----------------------------
-def preprocess_raw(df: pd.DataFrame) -> pd.DataFrame:
+def _category_codes(s: pd.Series, categories: list) -> pd.Series:
+    # Recode by value (set_categories), not by position: an unordered astype
+    # between dtypes with the same categories would keep the old codes.
+    # Blank or unseen values get code -1.
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype('category')
+    return s.cat.set_categories(categories).cat.codes.astype(np.int8)
+
+def build_feature_matrix(df_raw: pd.DataFrame) -> tuple[np.ndarray, bool]:
+    # Computes the FEATURES straight into a pre-allocated (n, 19) buffer; no
+    # intermediate processed DataFrame on the hot path. Also reports whether
+    # any missing values had to be filled with 0.
     try:
-        # robust numeric casting
-        df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-        df['MonthlyCharges'] = pd.to_numeric(df['MonthlyCharges'], errors='coerce')
-        df['tenure'] = pd.to_numeric(df['tenure'], errors='coerce')
-
-        # binary maps
-        yes_no = {'Yes': 1, 'No': 0}
-        male_female = {'Male': 0, 'Female': 1}  # <- match training
-        df['gender'] = df['gender'].map(male_female)
-        df['Partner'] = df['Partner'].map(yes_no)
-        df['Dependents'] = df['Dependents'].map(yes_no)
-        df['PhoneService'] = df['PhoneService'].map(yes_no)
-        df['PaperlessBilling'] = df['PaperlessBilling'].map(yes_no)
-        df['MultipleLines_Yes'] = df['MultipleLines'].map(yes_no)
-
-        # Internet service
-        df['InternetService_Fiber optic'] = df['InternetService'].apply(lambda x: 1 if x == 'Fiber optic' else 0)
-        df['InternetService_No'] = df['InternetService'].apply(lambda x: 1 if x == 'No' else 0)
+        X = np.empty((len(df_raw), len(FEATURES)), dtype=FEATURE_DTYPE)
+
+        # robust numeric casting (one dispatched pass)
+        numeric = df_raw[RAW_NUMERIC].apply(pd.to_numeric, errors='coerce')
+        tenure = numeric['tenure'].to_numpy(dtype=FEATURE_DTYPE)
+        monthly = numeric['MonthlyCharges'].to_numpy(dtype=FEATURE_DTYPE)
+        total = numeric['TotalCharges'].to_numpy(dtype=FEATURE_DTYPE)
+
+        # binary flags: one hashed categorical pass per column. Blank or unseen
+        # values (e.g. 'No phone service') get code -1: those count as missing
+        # and are filled with 0
+        binary = df_raw[BINARY_YES_NO].apply(_category_codes, categories=YES_NO)
+        binary['gender'] = _category_codes(df_raw['gender'], MALE_FEMALE)
+        unknown_codes = bool((binary.to_numpy() < 0).any())
+        if unknown_codes:
+            binary = binary.clip(lower=0)
+        X[:, _COL['gender']] = binary['gender']
+        X[:, _COL['SeniorCitizen']] = numeric['SeniorCitizen'].to_numpy(dtype=FEATURE_DTYPE)
+        X[:, _COL['Partner']] = binary['Partner']
+        X[:, _COL['Dependents']] = binary['Dependents']
+        X[:, _COL['tenure']] = tenure
+        X[:, _COL['PhoneService']] = binary['PhoneService']
+        X[:, _COL['PaperlessBilling']] = binary['PaperlessBilling']
+        X[:, _COL['MonthlyCharges']] = monthly
+        X[:, _COL['TotalCharges']] = total
+        X[:, _COL['MultipleLines_Yes']] = binary['MultipleLines']
+
+        # Internet service (compared on category codes when read with RAW_DTYPES)
+        X[:, _COL['InternetService_Fiber optic']] = df_raw['InternetService'] == 'Fiber optic'
+        X[:, _COL['InternetService_No']] = df_raw['InternetService'] == 'No'
 
         # Payment method 1-hot (subset used in training)
-        df['PaymentMethod_Credit card (automatic)'] = (df['PaymentMethod'] == 'Credit card (automatic)').astype(int)
-        df['PaymentMethod_Electronic check'] = (df['PaymentMethod'] == 'Electronic check').astype(int)
-        df['PaymentMethod_Mailed check'] = (df['PaymentMethod'] == 'Mailed check').astype(int)
-
-        # Engineered features (replicate training logic)
-        df['TenureGroup_Mid'] = df['tenure'].apply(lambda x: 1 if pd.notnull(x) and 12 <= x <= 36 else 0)
-        df['ChargeRatio'] = df['MonthlyCharges'] / (df['TotalCharges'] + 1)
-        df['Senior_Fiber'] = df['SeniorCitizen'] * df['InternetService_Fiber optic']
-        df['HighRisk'] = (df['MonthlyCharges'] > 80).astype(int)
-
-        # final selection & order
-        out = df[FEATURES].copy()
-        return out
+        payment = df_raw['PaymentMethod']
+        X[:, _COL['PaymentMethod_Credit card (automatic)']] = payment == 'Credit card (automatic)'
+        X[:, _COL['PaymentMethod_Electronic check']] = payment == 'Electronic check'
+        X[:, _COL['PaymentMethod_Mailed check']] = payment == 'Mailed check'
+
+        # Engineered features (replicate training logic) in one fused pass,
+        # written directly into their columns of X
+        engineer(
+            tenure, monthly, total,
+            X[:, _COL['SeniorCitizen']], X[:, _COL['InternetService_Fiber optic']],
+            X[:, _COL['ChargeRatio']], X[:, _COL['TenureGroup_Mid']],
+            X[:, _COL['Senior_Fiber']], X[:, _COL['HighRisk']],
+        )
+
+        # Clean NaNs (predict_proba can't handle NaN): only the coerced numeric
+        # inputs and what is derived from them can be missing
+        maybe_nan = X[:, _NAN_COLS]
+        nan_mask = np.isnan(maybe_nan)
+        had_nans = bool(nan_mask.any())
+        if had_nans:
+            maybe_nan[nan_mask] = 0
+            X[:, _NAN_COLS] = maybe_nan
+        return X, had_nans or unknown_codes
     except Exception as e:
         raise ValueError(f"Preprocessing error: {e}")
 
 # -----------------------------
 # BULK PREDICTION (CSV)
 # -----------------------------
+def prepare_features(df: pd.DataFrame, input_type: str) -> tuple[np.ndarray, bool]:
+    if input_type == "Raw CSV":
+        return build_feature_matrix(df)
+    else:
+        # Ensure preprocessed file has the exact columns in order
+        missing = [c for c in FEATURES if c not in df.columns]
+        if missing:
+            raise ValueError(f"Your preprocessed CSV is missing required columns: {missing}")
+
+        # One coercion pass over the text columns (see csv_column_types); copy
+        # so X is writable even when every column parsed as float
+        X = df[FEATURES].apply(pd.to_numeric).to_numpy(dtype=FEATURE_DTYPE, copy=True)
+
+        # Clean NaNs (predict_proba can't handle NaN)
+        nan_mask = np.isnan(X)
+        had_nans = bool(nan_mask.any())
+        if had_nans:
+            X[nan_mask] = 0
+        return X, had_nans
+
+def csv_column_types(file_bytes: bytes, input_type: str) -> dict:
+    # The streaming reader would otherwise fix each column's type from the
+    # first block, so a customerID or an extra column that looks numeric (or
+    # empty) early and holds text later fails mid-file. Type every column up
+    # front: the raw categoricals as above, everything else as plain text
+    # (numeric inputs are coerced in prepare_features, so the download keeps
+    # the uploaded text, e.g. '1' rather than '1.0').
+    header = next(csv.reader(io.TextIOWrapper(io.BytesIO(file_bytes), encoding="utf-8-sig")), [])
+    known = RAW_DTYPES if input_type == "Raw CSV" else {}
+    return {name: known.get(name, pa.string()) for name in header}
+
+@st.cache_data(show_spinner=False, max_entries=8, ttl=3600)
+def run_bulk(file_bytes: bytes, input_type: str) -> tuple[pd.DataFrame, bytes, bool]:
+    # Keyed on the raw upload bytes, so widget reruns don't redo the work.
+    # The CSV is parsed and scored one record batch at a time into a temp
+    # file, so only the parsed DataFrame is bounded by CSV_BLOCK_SIZE; the
+    # upload bytes and the returned output bytes are still held whole.
+    reader = pa_csv.open_csv(
+        io.BytesIO(file_bytes),
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True),
+        # strings_can_be_null: '', 'NA', 'null', ... read as missing, like read_csv
+        convert_options=pa_csv.ConvertOptions(
+            column_types=csv_column_types(file_bytes, input_type), strings_can_be_null=True,
+        ),
+    )
+    preview = None
+    had_nans = False
+    with tempfile.TemporaryFile() as tmp:
+        for batch in reader:
+            chunk = batch.to_pandas()
+            X, chunk_nans = prepare_features(chunk, input_type)
+            had_nans |= chunk_nans
+
+            # Predict probabilities for all rows in the chunk
+            chunk["Churn Probability"] = model.predict_proba(X)[:, 1]
+            chunk.to_csv(tmp, header=preview is None, index=False, encoding="utf-8")
+            if preview is None:
+                preview = chunk.head(PREVIEW_ROWS)
+
+        if preview is None:
+            raise ValueError("Uploaded CSV has no rows.")
+        tmp.seek(0)
+        csv_bytes = tmp.read()
+
+    return preview, csv_bytes, had_nans
+
 st.header("📤 Upload Data for Bulk Prediction")
 
 input_type = st.radio("Choose input type:", ["Raw CSV", "Preprocessed CSV"])
 csv_file = st.file_uploader("Upload CSV file", type=["csv"])
 
 if csv_file:
-    df_uploaded = pd.read_csv(csv_file)
-    st.write("📄 Uploaded Data Preview:", df_uploaded.head())
-
-    if input_type == "Raw CSV":
+    # Only redo the bulk work when the upload (or input type) changes, not on
+    # every rerun triggered by the manual form below. Keyed on the upload's
+    # file_id so reruns don't re-hash the file; run_bulk itself is cached on
+    # the plain bytes, which Streamlit hashes cheaply (unlike an UploadedFile
+    # or a parsed DataFrame). Only the preview and NaN flag are kept in
+    # session state; the output bytes stay in run_bulk's cache alone
+    bulk_key = (csv_file.file_id, input_type)
+    if st.session_state.get('bulk_key') != bulk_key:
         try:
-            df_processed = preprocess_raw(df_uploaded.copy())
-            st.success("✅ Raw data successfully preprocessed.")
+            df_preview, _, had_nans = run_bulk(csv_file.getvalue(), input_type)
         except Exception as e:
-            st.error(f"Error in preprocessing: {e}")
+            st.error(f"Prediction failed: {e}")
             st.stop()
-    else:
-        # Ensure preprocessed file has the exact columns in order
-        missing = [c for c in FEATURES if c not in df_uploaded.columns]
-        if missing:
-            st.error(f"Your preprocessed CSV is missing required columns: {missing}")
-            st.stop()
-        df_processed = df_uploaded[FEATURES].copy()
+        st.session_state['bulk_result'] = (df_preview, had_nans)
+        st.session_state['bulk_key'] = bulk_key
+    df_preview, had_nans = st.session_state['bulk_result']
 
-    # Clean NaNs (predict_proba can't handle NaN)
-    if df_processed.isnull().any().any():
+    st.write("📄 Uploaded Data Preview:", df_preview.drop(columns="Churn Probability").head())
+    if had_nans:
         st.warning("⚠️ Some values were missing — filling NaNs with 0.")
-        df_processed = df_processed.fillna(0)
+    if input_type == "Raw CSV":
+        st.success("✅ Raw data successfully preprocessed.")
+    st.write(f"🔮 Predictions (first {len(df_preview)} rows):", df_preview)
 
-    try:
-        # Predict probabilities for all rows
-        probs = model.predict_proba(df_processed.values)[:, 1]
-        df_result = df_uploaded.copy()
-        df_result["Churn Probability"] = probs
-        st.write("🔮 Predictions:", df_result)
-
-        # Download button
-        st.download_button(
-            "📥 Download Predictions",
-            df_result.to_csv(index=False).encode("utf-8"),
-            "churn_predictions.csv",
-            "text/csv"
-        )
-    except Exception as e:
-        st.error(f"Prediction failed: {e}")
+    # Download button; the CSV is fetched from run_bulk's cache only on click
+    st.download_button(
+        "📥 Download Predictions",
+        lambda upload=csv_file, kind=input_type: run_bulk(upload.getvalue(), kind)[1],
+        "churn_predictions.csv",
+        "text/csv"
+    )
 
 st.divider()
 
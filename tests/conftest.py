@@ -0,0 +1,20 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def app():
+    # The app loads churn_model.pkl relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+    try:
+        yield importlib.import_module("streamlit_app")
+    finally:
+        sys.path.remove(REPO_ROOT)
+        os.chdir(cwd)
@@ -0,0 +1,61 @@
+import io
+
+import pandas as pd
+
+
+def _late_text_csv(df: pd.DataFrame, block_size: int) -> bytes:
+    # Numeric customerIDs and an empty Notes column for well past the first
+    # block, then text in both near the end of the file
+    n = len(df)
+    df.insert(0, "customerID", [str(i) for i in range(n)])
+    df["Notes"] = ""
+    df.loc[n - 1, "customerID"] = "X-1"
+    df.loc[n - 1, "Notes"] = "moved abroad"
+    data = df.to_csv(index=False).encode()
+    assert len(data) > block_size
+    return data
+
+
+RAW_ROW = {
+    "gender": "Female", "SeniorCitizen": 0, "Partner": "Yes", "Dependents": "No",
+    "tenure": 12, "PhoneService": "Yes", "PaperlessBilling": "Yes",
+    "MonthlyCharges": 70.35, "TotalCharges": 844.2, "MultipleLines": "No",
+    "InternetService": "Fiber optic", "PaymentMethod": "Electronic check",
+}
+
+
+def test_raw_upload_larger_than_block(app):
+    n = app.CSV_BLOCK_SIZE // 60
+    data = _late_text_csv(pd.DataFrame([RAW_ROW] * n), app.CSV_BLOCK_SIZE)
+
+    preview, csv_bytes, had_nans = app.run_bulk.__wrapped__(data, "Raw CSV")
+
+    out = pd.read_csv(io.BytesIO(csv_bytes), dtype={"customerID": str, "Notes": str})
+    assert len(out) == n
+    assert out["customerID"].iloc[-1] == "X-1"
+    assert out["Notes"].iloc[-1] == "moved abroad"
+    assert out["Churn Probability"].between(0, 1).all()
+    assert not had_nans
+    # Uploaded values are written back as they were (e.g. 12, not 12.0)
+    in_rows, out_rows = data.splitlines(), csv_bytes.splitlines()
+    assert out_rows[1].startswith(in_rows[1] + b",")
+    assert out_rows[-1].startswith(in_rows[-1] + b",")
+
+
+def test_preprocessed_upload_larger_than_block(app):
+    n = app.CSV_BLOCK_SIZE // 40
+    row = dict.fromkeys(app.FEATURES, 0)
+    row.update({"tenure": 12, "MonthlyCharges": 70.35, "TotalCharges": 844.2, "ChargeRatio": 0.08})
+    data = _late_text_csv(pd.DataFrame([row] * n), app.CSV_BLOCK_SIZE)
+
+    preview, csv_bytes, had_nans = app.run_bulk.__wrapped__(data, "Preprocessed CSV")
+
+    out = pd.read_csv(io.BytesIO(csv_bytes), dtype={"customerID": str, "Notes": str})
+    assert len(out) == n
+    assert out["customerID"].iloc[-1] == "X-1"
+    assert out["Notes"].iloc[-1] == "moved abroad"
+    assert not had_nans
+    # Uploaded values are written back as they were (e.g. 12, not 12.0)
+    in_rows, out_rows = data.splitlines(), csv_bytes.splitlines()
+    assert out_rows[1].startswith(in_rows[1] + b",")
+    assert out_rows[-1].startswith(in_rows[-1] + b",")
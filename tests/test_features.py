@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+import pyarrow.csv as pa_csv
+import pytest
+
+RAW_HEADER = (
+    "customerID,gender,SeniorCitizen,Partner,Dependents,tenure,PhoneService,"
+    "PaperlessBilling,MonthlyCharges,TotalCharges,MultipleLines,InternetService,PaymentMethod\n"
+)
+
+
+def _raw_frame(app, rows: list[str]):
+    # Parse like run_bulk does, so categoricals and text columns are covered
+    data = (RAW_HEADER + "".join(r + "\n" for r in rows)).encode()
+    convert_options = pa_csv.ConvertOptions(
+        column_types=app.csv_column_types(data, "Raw CSV"), strings_can_be_null=True,
+    )
+    return pa_csv.read_csv(io.BytesIO(data), convert_options=convert_options).to_pandas()
+
+
+# Expected rows in FEATURES order:
+#   gender, SeniorCitizen, Partner, Dependents, tenure, PhoneService,
+#   PaperlessBilling, MonthlyCharges, TotalCharges, MultipleLines_Yes,
+#   Fiber optic, InternetService_No, Credit card, Electronic check,
+#   Mailed check, TenureGroup_Mid, ChargeRatio, Senior_Fiber, HighRisk
+CLEAN_ROWS = [
+    ("a,Female,1,Yes,No,12,Yes,Yes,85.5,1026,Yes,Fiber optic,Credit card (automatic)",
+     [1, 1, 1, 0, 12, 1, 1, 85.5, 1026, 1, 1, 0, 1, 0, 0, 1, 85.5 / 1027, 1, 1]),
+    ("b,Male,0,No,Yes,36,Yes,No,20,720,No,No,Mailed check",
+     [0, 0, 0, 1, 36, 1, 0, 20, 720, 0, 0, 1, 0, 0, 1, 1, 20 / 721, 0, 0]),
+    ("c,Male,1,No,No,11,Yes,Yes,80,880,No,DSL,Electronic check",
+     [0, 1, 0, 0, 11, 1, 1, 80, 880, 0, 0, 0, 0, 1, 0, 0, 80 / 881, 0, 0]),
+    ("d,Female,0,Yes,Yes,37,Yes,No,99.65,3687.05,Yes,Fiber optic,Bank transfer (automatic)",
+     [1, 0, 1, 1, 37, 1, 0, 99.65, 3687.05, 1, 1, 0, 0, 0, 0, 0, 99.65 / 3688.05, 0, 1]),
+]
+
+# One missing or unknown value per row; each is filled with 0 and must be reported
+MISSING_ROWS = [
+    pytest.param(
+        "e,Female,0,No,No,2,Yes,Yes,53.85, ,No,DSL,Mailed check",
+        [1, 0, 0, 0, 2, 1, 1, 53.85, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
+        id="blank TotalCharges",
+    ),
+    pytest.param(
+        "f,Male,0,No,No,,Yes,No,90,900,No,Fiber optic,Mailed check",
+        [0, 0, 0, 0, 0, 1, 0, 90, 900, 0, 1, 0, 0, 0, 1, 0, 90 / 901, 0, 1],
+        id="NaN tenure",
+    ),
+    pytest.param(
+        "g,Female,0,Yes,No,24,No,Yes,29.85,716.4,No phone service,DSL,Electronic check",
+        [1, 0, 1, 0, 24, 0, 1, 29.85, 716.4, 0, 0, 0, 0, 1, 0, 1, 29.85 / 717.4, 0, 0],
+        id="No phone service",
+    ),
+    pytest.param(
+        "h,,1,No,No,24,Yes,Yes,70,1680,Yes,Fiber optic,Electronic check",
+        [0, 1, 0, 0, 24, 1, 1, 70, 1680, 1, 1, 0, 0, 1, 0, 1, 70 / 1681, 1, 0],
+        id="blank gender",
+    ),
+]
+
+
+def test_build_feature_matrix_clean_rows(app):
+    X, had_nans = app.build_feature_matrix(_raw_frame(app, [r for r, _ in CLEAN_ROWS]))
+
+    assert X.dtype == np.float64
+    np.testing.assert_allclose(X, [expected for _, expected in CLEAN_ROWS], rtol=0, atol=1e-12)
+    assert not had_nans
+
+
+@pytest.mark.parametrize("row, expected", MISSING_ROWS)
+def test_build_feature_matrix_fills_missing_values(app, row, expected):
+    clean_row, clean_expected = CLEAN_ROWS[0]
+    X, had_nans = app.build_feature_matrix(_raw_frame(app, [clean_row, row]))
+
+    np.testing.assert_allclose(X, [clean_expected, expected], rtol=0, atol=1e-12)
+    assert had_nans